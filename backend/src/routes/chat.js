@@ -19,6 +19,42 @@ try {
   console.log("⚠️ Dataset not found or unreadable:", err.message);
 }
 
+// Retrieval index service for few-shot examples (python train/index.py serve)
+const INDEX_URL = process.env.MIRA_INDEX_URL || "http://127.0.0.1:8765";
+// Approximate tokens allowed for few-shot examples (see train/tokens.py)
+const EXAMPLE_TOKEN_BUDGET = Number(process.env.MIRA_EXAMPLE_TOKEN_BUDGET || 600);
+
+// Greedy packing as in train/tokens.py: examples in order while they fit the budget
+function packExamples(examples, budget, k) {
+  const chosen = [];
+  let used = 0;
+  for (const ex of examples) {
+    if (chosen.length === k) break;
+    const tokens = ex.tokens ?? Math.ceil(`${ex.question} ${ex.answer}`.length / 4) + 6;
+    if (used + tokens <= budget) {
+      chosen.push(ex);
+      used += tokens;
+    }
+  }
+  return chosen;
+}
+
+async function relevantExamples(message, k = 5) {
+  try {
+    const res = await fetch(
+      `${INDEX_URL}/search?q=${encodeURIComponent(message)}&k=${k}&budget=${EXAMPLE_TOKEN_BUDGET}`,
+      { signal: AbortSignal.timeout(500) }
+    );
+    if (res.ok) {
+      const { results } = await res.json();
+      if (results.length) return results;
+    }
+  } catch {
+    // index service not running; fall back to the first examples that fit
+  }
+  return packExamples(dataset, EXAMPLE_TOKEN_BUDGET, k);
+}
+
 // ---------------- CUSTOM PROMPT ----------------
 const SYSTEM_PROMPT = `
 You are MIRA — a friendly and empathetic mental health companion.
@@ -48,9 +84,8 @@ router.post("/", async (req, res) => {
     const model = genAI.getGenerativeModel({ model: "gemini-2.0-flash-exp" });
 
     // Add relevant examples for contextual support
-    const fewShotExamples = dataset
-      .slice(0, 5)
-      .map((ex) => `User: ${ex.instruction}\nMira: ${ex.response}`)
+    const fewShotExamples = (await relevantExamples(message))
+      .map((ex) => `User: ${ex.question}\nMira: ${ex.answer}`)
       .join("\n\n");
 
     const prompt = `
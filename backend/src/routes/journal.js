@@ -11,6 +11,24 @@ const router = express.Router();
 const sentiment = new Sentiment();
 const openai = new OpenAI({ apiKey: process.env.OPENAI_API_KEY });
 
+// Phrase matcher pre-filter (python train/matcher.py serve)
+const MATCHER_URL = process.env.MIRA_MATCHER_URL || "http://127.0.0.1:8766";
+
+async function matchCrisis(content) {
+  try {
+    const res = await fetch(`${MATCHER_URL}/classify`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ text: content }),
+      signal: AbortSignal.timeout(300),
+    });
+    if (res.ok) return (await res.json()).crisis;
+  } catch {
+    // matcher service not running; the caller's keyword list still applies
+  }
+  return false;
+}
+
 /**
  * POST /api/journal
  * Create a journal entry with emotion + crisis detection
@@ -21,7 +39,7 @@ router.post("/", auth, async (req, res) => {
     return res.status(400).json({ message: "Journal content is required" });
 
   try {
-    // 🚨 Crisis Keyword Detection
+    // 🚨 Crisis Keyword Detection (keep in sync with train/matcher.py)
     const crisisKeywords = [
       "suicide",
       "kill myself",
@@ -37,9 +55,11 @@ router.post("/", auth, async (req, res) => {
       "goodbye forever",
       "better off dead",
     ];
-    const crisisDetected = crisisKeywords.some((kw) =>
-      content.toLowerCase().includes(kw)
-    );
+    // either check flags: the keyword list is the recall floor, the matcher adds stems;
+    // it runs first so flagged entries skip the matcher round trip
+    const crisisDetected =
+      crisisKeywords.some((kw) => content.toLowerCase().includes(kw)) ||
+      (await matchCrisis(content));
 
     if (crisisDetected) {
       const { data, error } = await supabase
@@ -0,0 +1,180 @@
+"""Benchmarks for the corpus build.
+
+Generates synthetic mentalchat-style and intents-style sources (half the
+records each) and runs preprocess.py over them in each mode, recording wall
+time, throughput, peak RSS and per-stage seconds per run. Results are written to a JSON file that
+can be compared against a previous run to catch regressions:
+
+    python bench.py --sizes 16k 160k -o bench_results.json
+    python bench.py --sizes 16k 160k --compare baseline.json --threshold 0.15
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SIZES = {"16k": 16_000, "160k": 160_000, "1.6m": 1_600_000}
+MODES = {
+    "memory": [],
+    "stream": ["--stream"],
+    "jsonl": ["--stream", "--format", "jsonl"],
+    "serial": ["--stream", "--jobs", "1"],
+    "dedup": ["--stream", "--dedup"],
+    "columnar": ["--stream", "--columnar", "{out}.col"],
+    "cached": ["--stream"],  # second run over a warm shard cache
+}
+PATTERNS_PER_INTENT = 50
+RESPONSES_PER_INTENT = 20
+
+_WORDS = ("i feel really so very not anxious sad tired lonely stressed angry hopeful work school "
+          "family friends sleep night day today always never think know want need help talk "
+          "about my me you it that this with because but and like just can can't don't "
+          "better worse again lately everything nothing someone anyone").split()
+
+
+def _sentence(rng, lo, hi):
+    words = [rng.choice(_WORDS) for _ in range(rng.randint(lo, hi))]
+    return " ".join(words).capitalize() + rng.choice(".?!")
+
+
+def generate(size, workdir, seed=0):
+    """Write mentalchat.json and intents.json holding `size` records between them
+    (reused when already present); returns their paths."""
+    os.makedirs(workdir, exist_ok=True)
+    qa_path = os.path.join(workdir, "mentalchat.json")
+    intents_path = os.path.join(workdir, "intents.json")
+    rng = random.Random(seed)
+    if not os.path.exists(qa_path):
+        with open(qa_path + ".tmp", "w", encoding="utf-8") as f:
+            f.write("[\n")
+            for i in range(size // 2):
+                row = {"instruction": "You are a helpful mental health counselling assistant.",
+                       "input": _sentence(rng, 8, 60), "output": _sentence(rng, 30, 200)}
+                f.write((",\n" if i else "") + json.dumps(row))
+            f.write("\n]\n")
+        os.replace(qa_path + ".tmp", qa_path)
+    if not os.path.exists(intents_path):
+        per_intent = PATTERNS_PER_INTENT * RESPONSES_PER_INTENT
+        intents = [{"tag": f"tag{i}",
+                    "patterns": [_sentence(rng, 2, 10) for _ in range(PATTERNS_PER_INTENT)],
+                    "responses": [_sentence(rng, 6, 25) for _ in range(RESPONSES_PER_INTENT)]}
+                   for i in range(math.ceil(size / 2 / per_intent))]
+        with open(intents_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"intents": intents}, f, indent=2)
+        os.replace(intents_path + ".tmp", intents_path)
+    return [qa_path, intents_path]
+
+
+def run_child(result_path, argv):
+    sys.path.insert(0, HERE)
+    import preprocess
+    from util import peak_rss_mb
+    start = time.perf_counter()
+    count = preprocess.main(argv)
+    seconds = time.perf_counter() - start
+    with open(result_path, "w", encoding="utf-8") as f:
+        json.dump({"records_out": count, "seconds": seconds, "peak_rss_mb": peak_rss_mb(children=True)}, f)
+
+
+def run_mode(mode, sources, workdir):
+    out = os.path.join(workdir, f"out-{mode}")
+    cache = os.path.join(workdir, f"cache-{mode}")
+    shutil.rmtree(cache, ignore_errors=True)
+    argv = sources + ["-o", out + (".jsonl" if "jsonl" in MODES[mode] else ".json"), "--cache-dir", cache,
+                      "--dedup-report", out + ".dedup.json", "--metrics-json", out + ".metrics.json"]
+    argv += [arg.format(out=out) for arg in MODES[mode]]
+    result = os.path.join(workdir, "result.json")
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", result, "--"]
+    if mode == "cached":
+        subprocess.run(cmd + argv, check=True, stdout=subprocess.DEVNULL)
+    subprocess.run(cmd + argv, check=True, stdout=subprocess.DEVNULL)
+    with open(result, "r", encoding="utf-8") as f:
+        r = json.load(f)
+    with open(out + ".metrics.json", "r", encoding="utf-8") as f:
+        stages = json.load(f)["stages"]
+    r["stages"] = {st["stage"]: st["seconds"] for st in stages}
+    # throughput counts source records parsed, so modes that drop records (dedup) stay comparable
+    r["records_in"] = next(st["records_out"] for st in stages if st["stage"] == "parse")
+    r["records_per_s"] = r["records_in"] / r["seconds"] if r["seconds"] else None
+    return r
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Rows of (size, mode, metric, old, new, change) that got worse by more than `threshold`."""
+    old = {(r["size"], r["mode"]): r for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        base = old.get((r["size"], r["mode"]))
+        if not base:
+            continue
+        for metric in ("seconds", "peak_rss_mb"):
+            if base.get(metric) and r.get(metric) is not None:
+                change = r[metric] / base[metric] - 1
+                if change > threshold:
+                    regressions.append((r["size"], r["mode"], metric, base[metric], r[metric], change))
+    return regressions
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["--child"]:
+        return run_child(argv[1], argv[3:])
+
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--sizes", nargs="+", choices=SIZES, default=list(SIZES))
+    p.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    p.add_argument("--workdir", default="bench_data", help="generated sources and outputs (kept between runs)")
+    p.add_argument("--repeat", type=int, default=1, help="runs per case; the fastest is kept")
+    p.add_argument("-o", "--output", default="bench_results.json")
+    p.add_argument("--compare", metavar="BASELINE", help="results file of an earlier run")
+    p.add_argument("--threshold", type=float, default=0.10,
+                   help="relative slowdown or RSS growth counted as a regression")
+    args = p.parse_args(argv)
+
+    results = []
+    print(f"{'size':<7}{'mode':<10}{'in':>10}{'out':>10}{'seconds':>10}{'records/s':>12}{'peak RSS MB':>13}")
+    for size in args.sizes:
+        workdir = os.path.abspath(os.path.join(args.workdir, size))
+        sources = generate(SIZES[size], workdir)
+        for mode in args.modes:
+            runs = [run_mode(mode, sources, workdir) for _ in range(args.repeat)]
+            r = dict(min(runs, key=lambda run: run["seconds"]), size=size, mode=mode)
+            results.append(r)
+            rss = "n/a" if r["peak_rss_mb"] is None else f"{r['peak_rss_mb']:.1f}"
+            print(f"{size:<7}{mode:<10}{r['records_in']:>10}{r['records_out']:>10}{r['seconds']:>10.2f}"
+                  f"{r['records_per_s']:>12.0f}{rss:>13}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"commit": git_commit(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                   "python": platform.python_version(), "platform": platform.platform(),
+                   "results": results}, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for size, mode, metric, old, new, change in regressions:
+            print(f"⚠️ {size} {mode}: {metric} {old:.2f} -> {new:.2f} (+{change:.0%})")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} against {baseline.get('commit') or args.compare} ✅")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Load time and peak RSS of merged_mira.json versus the columnar artifact.
+
+    python preprocess.py --columnar merged_mira.col
+    python bench_columnar.py merged_mira.json merged_mira.col
+
+Every case runs in a fresh interpreter so peak RSS is not shared between cases.
+"""
+import argparse
+import json
+import random
+import subprocess
+import sys
+import time
+
+from util import peak_rss_mb
+
+
+def _baseline(json_path, col_path):
+    pass
+
+
+def _json_load(json_path, col_path):
+    with open(json_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return len(data)
+
+
+def _columnar_open(json_path, col_path):
+    from columnar import ColumnarReader
+    return len(ColumnarReader(col_path))
+
+
+def _columnar_random(json_path, col_path):
+    from columnar import ColumnarReader
+    reader = ColumnarReader(col_path)
+    rng = random.Random(0)
+    for _ in range(1000):
+        reader[rng.randrange(len(reader))]
+    return len(reader)
+
+
+def _columnar_scan(json_path, col_path):
+    from columnar import ColumnarReader
+    reader = ColumnarReader(col_path)
+    return sum(1 for _ in reader)
+
+
+CASES = {
+    "interpreter": _baseline,
+    "json.load": _json_load,
+    "columnar open": _columnar_open,
+    "columnar 1k random rows": _columnar_random,
+    "columnar full scan": _columnar_scan,
+}
+
+
+def run_case(name, json_path, col_path):
+    start = time.perf_counter()
+    CASES[name](json_path, col_path)
+    print(json.dumps({"seconds": time.perf_counter() - start, "peak_rss_mb": peak_rss_mb()}))
+
+
+def measure(name, json_path, col_path, repeat):
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, __file__, "--case", name, json_path, col_path],
+                             check=True, capture_output=True, text=True).stdout
+        runs.append(json.loads(out))
+    best = min(runs, key=lambda r: r["seconds"])
+    return {"case": name, "seconds": best["seconds"], "peak_rss_mb": best["peak_rss_mb"]}
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("json_path", nargs="?", default="merged_mira.json")
+    p.add_argument("col_path", nargs="?", default="merged_mira.col")
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--json", metavar="PATH", help="also write the results as JSON")
+    p.add_argument("--case", choices=CASES, help=argparse.SUPPRESS)
+    args = p.parse_args(argv)
+
+    if args.case:
+        return run_case(args.case, args.json_path, args.col_path)
+
+    results = [measure(name, args.json_path, args.col_path, args.repeat) for name in CASES]
+    print(f"{'case':<26}{'seconds':>10}{'peak RSS MB':>14}")
+    for r in results:
+        rss = "n/a" if r["peak_rss_mb"] is None else f"{r['peak_rss_mb']:.1f}"
+        print(f"{r['case']:<26}{r['seconds']:>10.4f}{rss:>14}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""Compact columnar artifact for the merged corpus.
+
+File layout (little-endian, every section 8-byte aligned):
+    magic        b"MIRACOL\\x01"
+    u32          length of the JSON header
+    header       {"rows", "compression", "block_rows", "columns": {name: {type, section offsets}}}
+    utf8 column  u64 offsets[rows + 1] into the column's uncompressed UTF-8 data,
+                 then the data itself, or with zstd: u64 blocks[nblocks + 1] into
+                 the compressed data followed by one zstd frame per block_rows rows
+    u32 column   u32 values[rows], never compressed
+
+Uncompressed files are read through mmap without copying: `raw()` and `blob()`
+return memoryviews straight into the page cache.
+"""
+import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+from array import array
+
+from util import write_le
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MAGIC = b"MIRACOL\x01"
+COLUMNS = ("question", "answer", "source", "tag")
+NUMERIC = ("tokens",)
+_FLUSH_ROWS = 1 << 16
+
+
+def _require_zstd():
+    if zstandard is None:
+        raise RuntimeError("zstd compression needs the zstandard package (pip install zstandard)")
+
+
+def _pad(f):
+    f.write(b"\0" * (-f.tell() % 8))
+
+
+class _Column:
+    def __init__(self, tmpdir, name, compress):
+        self.data = open(os.path.join(tmpdir, f"{name}.data"), "w+b")
+        self.offsets = open(os.path.join(tmpdir, f"{name}.offsets"), "w+b")
+        self.pending = array("Q", [0])
+        self.pos = 0
+        self.block = bytearray() if compress else None
+        self.blocks = array("Q", [0])
+
+
+class ColumnarWriter:
+    """Streams records into a columnar file; memory stays bounded by one block per column."""
+
+    def __init__(self, path, columns=COLUMNS, numeric=NUMERIC, compression=None, block_rows=4096, level=3):
+        if compression not in (None, "zstd"):
+            raise ValueError(f"unknown compression: {compression}")
+        if compression:
+            _require_zstd()
+            self._zstd = zstandard.ZstdCompressor(level=level)
+        self.path = path
+        self.compression = compression
+        self.block_rows = block_rows
+        self.rows = 0
+        self._tmp = tempfile.TemporaryDirectory(prefix="mira-columnar-")
+        self._cols = {name: _Column(self._tmp.name, name, compression) for name in columns}
+        self._nums = {name: open(os.path.join(self._tmp.name, f"{name}.u32"), "w+b") for name in numeric}
+        self._pending_nums = {name: array("I") for name in numeric}
+
+    def add(self, rec):
+        for name, col in self._cols.items():
+            b = (rec.get(name) or "").encode("utf-8")
+            col.pos += len(b)
+            col.pending.append(col.pos)
+            if col.block is None:
+                col.data.write(b)
+            else:
+                col.block += b
+        for name, values in self._pending_nums.items():
+            values.append(rec.get(name) or 0)
+        self.rows += 1
+        if self.compression and self.rows % self.block_rows == 0:
+            self._flush_blocks()
+        if self.rows % _FLUSH_ROWS == 0:
+            self._flush_offsets()
+
+    def tee(self, recs):
+        """Pass records through unchanged while writing them."""
+        for rec in recs:
+            self.add(rec)
+            yield rec
+
+    def _flush_blocks(self):
+        for col in self._cols.values():
+            if col.block:
+                col.data.write(self._zstd.compress(bytes(col.block)))
+                col.block.clear()
+            col.blocks.append(col.data.tell())
+
+    def _flush_offsets(self):
+        for col in self._cols.values():
+            write_le(col.offsets, col.pending)
+            col.pending = array("Q")
+        for name, values in self._pending_nums.items():
+            write_le(self._nums[name], values)
+            self._pending_nums[name] = array("I")
+
+    def close(self):
+        if self.compression and self.rows % self.block_rows:
+            self._flush_blocks()
+        self._flush_offsets()
+        # section positions depend on the header length, which depends on the positions
+        header, size = None, 0
+        while True:
+            pos = 8 + 4 + size
+            pos += -pos % 8
+            columns = {}
+            for name, col in self._cols.items():
+                entry = {"type": "utf8", "offsets": pos}
+                pos += 8 * (self.rows + 1)
+                if self.compression:
+                    entry["blocks"] = pos
+                    pos += 8 * len(col.blocks)
+                entry["data"] = pos
+                entry["size"] = col.data.tell()
+                pos += entry["size"]
+                pos += -pos % 8
+                columns[name] = entry
+            for name in self._nums:
+                columns[name] = {"type": "u32", "values": pos}
+                pos += 4 * self.rows
+                pos += -pos % 8
+            header = json.dumps({"version": 1, "rows": self.rows, "compression": self.compression,
+                                 "block_rows": self.block_rows, "columns": columns}).encode("utf-8")
+            if len(header) == size:
+                break
+            size = len(header)
+
+        with open(self.path, "wb") as f:
+            f.write(MAGIC + struct.pack("<I", len(header)) + header)
+            _pad(f)
+            for col in self._cols.values():
+                col.offsets.seek(0)
+                shutil.copyfileobj(col.offsets, f)
+                if self.compression:
+                    write_le(f, col.blocks)
+                col.data.seek(0)
+                shutil.copyfileobj(col.data, f)
+                _pad(f)
+                col.offsets.close()
+                col.data.close()
+            for values in self._nums.values():
+                values.seek(0)
+                shutil.copyfileobj(values, f)
+                _pad(f)
+                values.close()
+        self._tmp.cleanup()
+        return self.rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ColumnarReader:
+    """Random access and slicing over a columnar file via mmap."""
+
+    def __init__(self, path):
+        if sys.byteorder != "little":
+            raise RuntimeError("columnar files are little-endian; big-endian hosts are not supported")
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._mm)
+        if buf[:8] != MAGIC:
+            raise ValueError(f"{path}: not a MIRA columnar file")
+        (size,) = struct.unpack_from("<I", buf, 8)
+        self.header = json.loads(bytes(buf[12:12 + size]))
+        self.rows = self.header["rows"]
+        self.columns = tuple(self.header["columns"])
+        self.compression = self.header["compression"]
+        if self.compression:
+            _require_zstd()
+            self._zstd = zstandard.ZstdDecompressor()
+        self._offsets, self._blocks, self._data, self._cache, self._values = {}, {}, {}, {}, {}
+        for name, c in self.header["columns"].items():
+            if c.get("type") == "u32":
+                self._values[name] = buf[c["values"]:c["values"] + 4 * self.rows].cast("I")
+                continue
+            self._offsets[name] = buf[c["offsets"]:c["offsets"] + 8 * (self.rows + 1)].cast("Q")
+            if self.compression:
+                nblocks = -(-self.rows // self.header["block_rows"])
+                self._blocks[name] = buf[c["blocks"]:c["blocks"] + 8 * (nblocks + 1)].cast("Q")
+            self._data[name] = buf[c["data"]:c["data"] + c["size"]]
+
+    def __len__(self):
+        return self.rows
+
+    def _block(self, name, b):
+        cached = self._cache.get(name)
+        if cached is None or cached[0] != b:
+            blocks = self._blocks[name]
+            frame = self._data[name][blocks[b]:blocks[b + 1]]
+            cached = (b, self._zstd.decompress(frame) if len(frame) else b"")
+            self._cache[name] = cached
+        return cached[1]
+
+    def raw(self, name, i):
+        """UTF-8 bytes of one cell; a zero-copy memoryview when uncompressed."""
+        if not 0 <= i < self.rows:
+            raise IndexError(i)
+        offsets = self._offsets[name]
+        if not self.compression:
+            return self._data[name][offsets[i]:offsets[i + 1]]
+        block_rows = self.header["block_rows"]
+        base = offsets[i - i % block_rows]
+        return memoryview(self._block(name, i // block_rows))[offsets[i] - base:offsets[i + 1] - base]
+
+    def blob(self, name, start, stop):
+        """(data, offsets) for rows [start, stop) of an uncompressed column, both zero-copy.
+        Row i spans data[offsets[i - start] - offsets[0]:offsets[i - start + 1] - offsets[0]]."""
+        if self.compression:
+            raise ValueError("blob() needs an uncompressed file")
+        offsets = self._offsets[name][start:stop + 1]
+        return self._data[name][offsets[0]:offsets[-1]], offsets
+
+    def numbers(self, name):
+        """Zero-copy view of a u32 column."""
+        return self._values[name]
+
+    def value(self, name, i):
+        if name in self._values:
+            return self._values[name][i]
+        return str(self.raw(name, i), "utf-8")
+
+    def row(self, i):
+        return {name: self.value(name, i) for name in self.columns}
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self.row(i) for i in range(*key.indices(self.rows))]
+        if key < 0:
+            key += self.rows
+        return self.row(key)
+
+    def __iter__(self):
+        for i in range(self.rows):
+            yield self.row(i)
+
+    def close(self):
+        # memoryviews handed out by raw()/blob() must be released before closing
+        self._offsets = self._blocks = self._data = self._cache = self._values = None
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
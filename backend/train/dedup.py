@@ -0,0 +1,132 @@
+import hashlib
+import json
+import re
+from array import array
+from collections import Counter
+
+_EMPTY = 1 << 32
+_OFFSET = 0x9E3779B1
+
+
+def shingles(text, k=4):
+    t = " ".join(re.findall(r"\w+", text.lower()))
+    if len(t) <= k:
+        return {t}
+    return {t[i:i + k] for i in range(len(t) - k + 1)}
+
+
+def _integrate(f, lo, hi, steps=200):
+    if hi <= lo:
+        return 0.0
+    dx = (hi - lo) / steps
+    return sum(f(lo + (i + 0.5) * dx) for i in range(steps)) * dx
+
+
+def choose_bands(num_perm, threshold, fp_weight=0.1, fn_weight=0.9):
+    """(bands, rows) with bands * rows <= num_perm minimizing the weighted area of
+    false positives (pairs below the threshold that share a bucket) and false
+    negatives (pairs above it that never do) under the S-curve 1 - (1 - s**r)**b,
+    as datasketch does. False negatives weigh more: a pair that never shares a
+    bucket is never compared, while a false positive only costs one signature check."""
+    best, best_err = None, None
+    for b in range(1, num_perm + 1):
+        for r in range(1, num_perm // b + 1):
+            fp = _integrate(lambda s: 1 - (1 - s ** r) ** b, 0.0, threshold)
+            fn = _integrate(lambda s: (1 - s ** r) ** b, threshold, 1.0)
+            err = fp_weight * fp + fn_weight * fn
+            if best_err is None or err < best_err:
+                best, best_err = (b, r), err
+    return best
+
+
+class Deduper:
+    """One-pass near-duplicate filter: MinHash signatures bucketed by LSH bands.
+
+    Each record is compared only against the cluster representatives that share
+    at least one band bucket with it, so the pass is roughly linear in the corpus.
+    The first record of each cluster is kept."""
+
+    def __init__(self, threshold=0.7, num_perm=64, shingle=4):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle = shingle
+        self.bands, self.rows = choose_bands(num_perm, threshold)
+        self.buckets = [{} for _ in range(self.bands)]
+        self.sigs = array("I")  # num_perm values per representative
+        self.sizes = array("I")
+        self.labels = []
+        self.seen = 0
+
+    def signature(self, text):
+        # one-permutation MinHash: each shingle hash lands in one of num_perm bins and
+        # bins keep their minimum, so the cost is O(shingles) rather than O(shingles * num_perm)
+        n = self.num_perm
+        sig = [_EMPTY] * n
+        for s in shingles(text, self.shingle):
+            h = int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+            b, v = h % n, h >> 32
+            if v < sig[b]:
+                sig[b] = v
+        # densify empty bins by rotation: borrow the next filled bin, offset by the distance
+        filled = [b for b in range(n) if sig[b] != _EMPTY]
+        if len(filled) < n:
+            nxt = filled[0] + n
+            for b in range(n - 1, -1, -1):
+                if sig[b] != _EMPTY:
+                    nxt = b
+                else:
+                    sig[b] = (sig[nxt % n] + (nxt - b) * _OFFSET) & 0xFFFFFFFF
+        return array("I", sig)
+
+    def similarity(self, sig, rep):
+        other = self.sigs[rep * self.num_perm:(rep + 1) * self.num_perm]
+        return sum(a == b for a, b in zip(sig, other)) / self.num_perm
+
+    def add(self, text):
+        """True if `text` starts a new cluster, False if it is a near-duplicate."""
+        self.seen += 1
+        sig = self.signature(text)
+        r = self.rows
+        keys = [hash(tuple(sig[i * r:(i + 1) * r])) for i in range(self.bands)]
+        checked = set()
+        for band, key in enumerate(keys):
+            for rep in self.buckets[band].get(key, ()):
+                if rep in checked:
+                    continue
+                checked.add(rep)
+                if self.similarity(sig, rep) >= self.threshold:
+                    self.sizes[rep] += 1
+                    return False
+        rep = len(self.sizes)
+        self.sigs.extend(sig)
+        self.sizes.append(1)
+        self.labels.append(text[:80])
+        for band, key in enumerate(keys):
+            self.buckets[band].setdefault(key, []).append(rep)
+        return True
+
+    def filter(self, recs, field="question"):
+        for rec in recs:
+            if self.add(rec[field]):
+                yield rec
+
+    def report(self, top=20):
+        clusters = len(self.sizes)
+        largest = sorted(range(clusters), key=lambda rep: -self.sizes[rep])[:top]
+        return {
+            "threshold": self.threshold,
+            "num_perm": self.num_perm,
+            "bands": self.bands,
+            "rows": self.rows,
+            "shingle": self.shingle,
+            "records_in": self.seen,
+            "records_out": clusters,
+            "duplicates_removed": self.seen - clusters,
+            "cluster_sizes": {str(size): n for size, n in sorted(Counter(self.sizes).items())},
+            "largest_clusters": [{"index": rep, "size": self.sizes[rep], "question": self.labels[rep]}
+                                 for rep in largest if self.sizes[rep] > 1],
+        }
+
+    def write_report(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2, ensure_ascii=False)
@@ -0,0 +1,287 @@
+"""BM25 retrieval index over the merged corpus, for few-shot example selection.
+
+Layout of an index directory (all arrays little-endian, memory-mapped at query time):
+    meta.json     corpus size, avgdl, BM25 parameters
+    vocab.json    term -> [start, end) slice into the postings arrays
+    postings.u32  doc ids, grouped by term
+    weights.f32   precomputed BM25 weight of the term in each posting's doc
+    docs.jsonl    {question, answer, source, tag, tokens} per doc
+    docs.u64      n + 1 byte offsets into docs.jsonl
+"""
+import argparse
+import heapq
+import json
+import math
+import mmap
+import os
+import sys
+import time
+from array import array
+from http.server import ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from jsonstream import iter_records
+from tokens import example_tokens, pack
+from util import JSONHandler, words, write_le
+
+try:
+    import numpy as np
+except ImportError:  # pure-Python scoring fallback
+    np = None
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from had has have he her him his i i'm if in is it it's its me my "
+    "of on or our she so that the their them they this to was we were what when which who will with "
+    "you your".split()
+)
+
+MAX_K = 50
+MAX_BUDGET = 8192
+MAX_QUERIES = 32
+# knapsack packing fills a (k + 1) x (budget + 1) table per candidate, per query (~60 ns a cell)
+KNAPSACK_CELLS = 1 << 22
+
+
+def candidate_pool(k):
+    """Distinct questions search() packs a token budget from."""
+    return max(4 * k, 20)
+
+
+def tokenize(text):
+    return [t for t in words(text) if t not in STOPWORDS]
+
+
+def build_index(corpus, out_dir, k1=1.2, b=0.75):
+    os.makedirs(out_dir, exist_ok=True)
+    doc_ids, tfs = {}, {}
+    lengths = array("I")
+    offsets = array("Q", [0])
+    with open(os.path.join(out_dir, "docs.jsonl"), "wb") as docs:
+        for doc, rec in enumerate(iter_records(corpus)):
+            terms = tokenize(rec["question"])
+            lengths.append(len(terms))
+            counts = {}
+            for t in terms:
+                counts[t] = counts.get(t, 0) + 1
+            for t, tf in counts.items():
+                if t not in doc_ids:
+                    doc_ids[t], tfs[t] = array("I"), array("H")
+                doc_ids[t].append(doc)
+                tfs[t].append(min(tf, 0xFFFF))
+            tokens = rec.get("tokens") or example_tokens(rec["question"], rec["answer"])
+            line = json.dumps({"question": rec["question"], "answer": rec["answer"], "source": rec.get("source"),
+                               "tag": rec.get("tag"), "tokens": tokens}, ensure_ascii=False)
+            docs.write(line.encode("utf-8") + b"\n")
+            offsets.append(docs.tell())
+
+    n = len(lengths)
+    avgdl = sum(lengths) / n if n else 0.0
+    vocab, start = {}, 0
+    with open(os.path.join(out_dir, "postings.u32"), "wb") as fp, \
+            open(os.path.join(out_dir, "weights.f32"), "wb") as fw:
+        for t in sorted(doc_ids):
+            ids, tf = doc_ids.pop(t), tfs.pop(t)
+            idf = math.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+            weights = array("f", (idf * f * (k1 + 1) / (f + k1 * (1 - b + b * lengths[d] / avgdl))
+                                  for d, f in zip(ids, tf)))
+            write_le(fp, ids)
+            write_le(fw, weights)
+            vocab[t] = [start, start + len(ids)]
+            start += len(ids)
+    with open(os.path.join(out_dir, "docs.u64"), "wb") as f:
+        write_le(f, offsets)
+    with open(os.path.join(out_dir, "vocab.json"), "w", encoding="utf-8") as f:
+        json.dump(vocab, f, ensure_ascii=False)
+    with open(os.path.join(out_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"version": 1, "docs": n, "terms": len(vocab), "postings": start,
+                   "avgdl": avgdl, "k1": k1, "b": b}, f, indent=2)
+    return n
+
+
+def _mmap_array(path, typecode):
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None, memoryview(b"").cast(typecode)
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return mm, memoryview(mm).cast(typecode)
+
+
+class Index:
+    def __init__(self, path):
+        if sys.byteorder != "little":
+            raise RuntimeError("memory-mapped index requires a little-endian host")
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        with open(os.path.join(path, "vocab.json"), "r", encoding="utf-8") as f:
+            self.vocab = json.load(f)
+        _, self.ids = _mmap_array(os.path.join(path, "postings.u32"), "I")
+        _, self.weights = _mmap_array(os.path.join(path, "weights.f32"), "f")
+        _, self.offsets = _mmap_array(os.path.join(path, "docs.u64"), "Q")
+        self.docs, _ = _mmap_array(os.path.join(path, "docs.jsonl"), "B")
+        if np is not None:
+            self.ids = np.frombuffer(self.ids, dtype="<u4")
+            self.weights = np.frombuffer(self.weights, dtype="<f4")
+
+    def __len__(self):
+        return self.meta["docs"]
+
+    def doc(self, i):
+        return json.loads(self.docs[self.offsets[i]:self.offsets[i + 1]])
+
+    def _spans(self, query):
+        return [self.vocab[t] for t in set(tokenize(query)) if t in self.vocab]
+
+    def top(self, query, k=5):
+        """[(score, doc)] of the k best-scoring docs, best first."""
+        if k <= 0:
+            return []
+        spans = self._spans(query)
+        if np is not None:
+            acc = np.zeros(len(self), dtype=np.float32)
+            for s, e in spans:
+                acc[self.ids[s:e]] += self.weights[s:e]  # doc ids are unique within a term
+            hits = np.flatnonzero(acc)
+            if len(hits) > k:
+                hits = hits[np.argpartition(acc[hits], -k)[-k:]]
+            return sorted(zip(acc[hits].tolist(), hits.tolist()), reverse=True)
+        acc = {}
+        for s, e in spans:
+            for d, w in zip(self.ids[s:e], self.weights[s:e]):
+                acc[d] = acc.get(d, 0.0) + w
+        return heapq.nlargest(k, ((w, d) for d, w in acc.items()))
+
+    def distinct(self, query, n):
+        """Docs of the n best-scoring distinct questions, best first, with their scores.
+
+        The intents source pairs every pattern with every response, so one question
+        can fill the whole top-k; only its best-scoring doc is kept. The pool is
+        widened until n questions are found or the hits run out."""
+        pool = 4 * n
+        while True:
+            hits = self.top(query, pool)
+            seen, docs = set(), []
+            for s, d in hits:
+                doc = self.doc(d)
+                key = " ".join(words(doc["question"]))
+                if key not in seen:
+                    seen.add(key)
+                    docs.append(dict(doc, score=round(s, 4)))
+                    if len(docs) == n:
+                        return docs
+            if len(hits) < pool:
+                return docs
+            pool *= 4
+
+    def search(self, query, k=5, budget=None, method="greedy"):
+        """Top-k examples with distinct questions; with a token `budget`, the most
+        relevant of a wider candidate pool that fit in it (at most k)."""
+        if k <= 0:
+            return []
+        if budget is None:
+            return self.distinct(query, k)
+        return pack(self.distinct(query, candidate_pool(k)), budget, max_items=k, method=method)
+
+    def search_many(self, queries, k=5, budget=None, method="greedy"):
+        # scored one query at a time: each query's postings are already summed in one
+        # vectorized scatter-add, and cost is bound by the postings touched, so a joint
+        # queries x docs accumulation (dense or sparse) measured 3-7x slower than this loop
+        return [self.search(q, k, budget, method) for q in queries]
+
+
+def search_params(k, budget, method, queries=1):
+    """(k, budget, method) converted and range-checked from request values for a
+    request of `queries` queries; raises ValueError."""
+    try:
+        k = int(k)
+        budget = None if budget in (None, "") else int(budget)
+    except (TypeError, ValueError):
+        raise ValueError("k and budget must be integers") from None
+    if not 0 <= k <= MAX_K:
+        raise ValueError(f"k must be between 0 and {MAX_K}")
+    if budget is not None and not 0 <= budget <= MAX_BUDGET:
+        raise ValueError(f"budget must be between 0 and {MAX_BUDGET}")
+    if method not in ("greedy", "knapsack"):
+        raise ValueError(f"unknown packing method: {method}")
+    if not 0 <= queries <= MAX_QUERIES:
+        raise ValueError(f"at most {MAX_QUERIES} queries per request")
+    if method == "knapsack" and budget is not None and \
+            queries * candidate_pool(k) * (k + 1) * (budget + 1) > KNAPSACK_CELLS:
+        raise ValueError(f"knapsack needs queries * max(4k, 20) * (k + 1) * (budget + 1) <= {KNAPSACK_CELLS}")
+    return k, budget, method
+
+
+def make_handler(index):
+    class Handler(JSONHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != "/search":
+                return self._send(404, {"error": "not found"})
+            qs = parse_qs(url.query)
+            query = qs.get("q", [""])[0]
+            if not query:
+                return self._send(400, {"error": "q is required"})
+            try:
+                k, budget, method = search_params(qs.get("k", ["5"])[0], qs.get("budget", [None])[0],
+                                                  qs.get("method", ["greedy"])[0])
+            except ValueError as err:
+                return self._send(400, {"error": str(err)})
+            self._send(200, {"results": index.search(query, k, budget, method)})
+
+        def do_POST(self):
+            if urlparse(self.path).path != "/search":
+                return self._send(404, {"error": "not found"})
+            body = self._read_json()
+            if body is None:
+                return
+            queries = body.get("queries") or []
+            if not isinstance(queries, list) or not all(isinstance(q, str) for q in queries):
+                return self._send(400, {"error": "queries must be a list of strings"})
+            try:
+                k, budget, method = search_params(body.get("k", 5), body.get("budget"), body.get("method", "greedy"),
+                                                  queries=len(queries))
+            except ValueError as err:
+                return self._send(400, {"error": str(err)})
+            self._send(200, {"results": index.search_many(queries, k, budget, method)})
+
+    return Handler
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Build or query the MIRA few-shot retrieval index.")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build")
+    b.add_argument("corpus", nargs="?", default="merged_mira.json")
+    b.add_argument("-o", "--out", default="mira_index")
+    q = sub.add_parser("query")
+    q.add_argument("queries", nargs="+")
+    q.add_argument("-i", "--index", default="mira_index")
+    q.add_argument("-k", type=int, default=5)
+    q.add_argument("--budget", type=int, help="token budget for the returned examples")
+    q.add_argument("--method", choices=("greedy", "knapsack"), default="greedy")
+    s = sub.add_parser("serve")
+    s.add_argument("-i", "--index", default="mira_index")
+    s.add_argument("--host", default="127.0.0.1")
+    s.add_argument("--port", type=int, default=8765)
+    args = p.parse_args(argv)
+
+    if args.cmd == "build":
+        start = time.perf_counter()
+        n = build_index(args.corpus, args.out)
+        print(f"Indexed {n} records in {time.perf_counter() - start:.1f}s ✅")
+    elif args.cmd == "query":
+        index = Index(args.index)
+        start = time.perf_counter()
+        results = index.search_many(args.queries, args.k, args.budget, args.method)
+        elapsed = (time.perf_counter() - start) * 1000
+        for query, hits in zip(args.queries, results):
+            print(json.dumps({"query": query, "results": hits}, ensure_ascii=False, indent=2))
+        print(f"{len(args.queries)} queries in {elapsed:.1f} ms", file=sys.stderr)
+    else:
+        index = Index(args.index)
+        server = ThreadingHTTPServer((args.host, args.port), make_handler(index))
+        print(f"🔎 Serving {len(index)} examples on http://{args.host}:{args.port}/search")
+        server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import json
+import re
+
+_decoder = json.JSONDecoder()
+_ws = re.compile(r"[ \t\n\r]*")
+_DELIMITERS = frozenset(" \t\n\r,]}")
+
+
+class _Reader:
+    """Buffered cursor over a text file that decodes one JSON value at a time."""
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, size=None):
+        data = self.f.read(size or self.chunk_size)
+        if not data:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            self.pos = _ws.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, ch):
+        if self.peek() != ch:
+            raise ValueError(f"expected {ch!r} in {self.f.name}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # value straddles the buffer end; grow geometrically so huge values stay linear
+                if not self.fill(max(self.chunk_size, len(self.buf) - self.pos)):
+                    raise
+                continue
+            # a number or literal ending at the buffer edge may continue in the next chunk, and a
+            # number cut inside it ("12." or "1e") decodes as its prefix, so it must end on a delimiter
+            number = isinstance(obj, (int, float)) and not isinstance(obj, bool)
+            if self.eof or (end < len(self.buf) and (not number or self.buf[end] in _DELIMITERS)):
+                self.pos = end
+                return obj
+            self.fill()
+
+
+def _seek_key(r, key):
+    r.expect("{")
+    while r.peek() != "}":
+        k = r.value()
+        r.expect(":")
+        if k == key:
+            return True
+        r.value()
+        if r.peek() == ",":
+            r.pos += 1
+    return False
+
+
+def iter_array(path, key=None, chunk_size=1 << 16):
+    """Yield the elements of a top-level JSON array, or of the array under `key`
+    when the document is an object, without loading the whole file."""
+    with open(path, "r", encoding="utf-8") as f:
+        r = _Reader(f, chunk_size)
+        ch = r.peek()
+        if ch == "{":
+            if key is None or not _seek_key(r, key):
+                return
+            if r.peek() != "[":
+                yield from r.value()
+                return
+        elif ch != "[":
+            raise ValueError(f"{path}: expected a JSON array or object")
+        r.expect("[")
+        if r.peek() == "]":
+            return
+        while True:
+            yield r.value()
+            ch = r.peek()
+            if ch == "]":
+                return
+            if ch != ",":
+                raise ValueError(f"{path}: malformed array")
+            r.pos += 1
+
+
+def iter_records(path):
+    """Records of a JSON Lines file, or of a (possibly huge) top-level JSON array."""
+    if path.endswith(".jsonl"):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        yield from iter_array(path)
@@ -0,0 +1,71 @@
+import hashlib
+import json
+import os
+
+MANIFEST = "manifest.json"
+
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class BuildCache:
+    """Content-addressed cache of normalized source shards.
+
+    manifest.json maps each source path to its content hash, size, mtime and the
+    shard it produced. Shard names derive from the content hash, the adapter, the
+    source name and the pipeline version, so any of those changing is a miss.
+    A source whose size and mtime match the manifest is not re-hashed."""
+
+    def __init__(self, cache_dir, version):
+        self.dir = cache_dir
+        self.shard_dir = os.path.join(cache_dir, "shards")
+        self.version = version
+        os.makedirs(self.shard_dir, exist_ok=True)
+        try:
+            with open(os.path.join(cache_dir, MANIFEST), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            manifest = {}
+        self.sources = manifest.get("sources", {}) if manifest.get("version") == version else {}
+
+    def lookup(self, path, kind, force=False):
+        """(shard path, manifest entry, hit). On a hit the entry carries the record
+        count and stage metrics of the build that produced the shard."""
+        prev = self.sources.get(os.path.abspath(path))
+        st = os.stat(path)
+        if not force and prev and prev["size"] == st.st_size and prev["mtime_ns"] == st.st_mtime_ns:
+            digest = prev["sha256"]
+        else:
+            digest = file_digest(path)
+        key = hashlib.sha256(f"{self.version}\0{kind}\0{os.path.basename(path)}\0{digest}".encode("utf-8"))
+        name = key.hexdigest()[:32] + ".jsonl"
+        shard = os.path.join(self.shard_dir, name)
+        entry = {"sha256": digest, "size": st.st_size, "mtime_ns": st.st_mtime_ns,
+                 "adapter": kind, "shard": name, "records": None, "stages": []}
+        built = None
+        if not force and os.path.exists(shard):
+            built = next((e for e in self.sources.values() if e["shard"] == name), None)
+        if built is None:
+            return shard, entry, False
+        entry.update(records=built["records"], stages=built.get("stages", []))
+        return shard, entry, True
+
+    def record(self, path, entry):
+        self.sources[os.path.abspath(path)] = entry
+
+    def save(self):
+        """Write the manifest and delete shards no existing source refers to any more."""
+        self.sources = {p: e for p, e in self.sources.items() if os.path.exists(p)}
+        live = {e["shard"] for e in self.sources.values()}
+        for name in os.listdir(self.shard_dir):
+            if name not in live:
+                os.remove(os.path.join(self.shard_dir, name))
+        tmp = os.path.join(self.dir, MANIFEST + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": self.version, "sources": self.sources}, f, indent=2)
+        os.replace(tmp, os.path.join(self.dir, MANIFEST))
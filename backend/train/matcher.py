@@ -0,0 +1,324 @@
+"""Crisis and intent pre-filter for journal entries.
+
+The crisis keywords from routes/journal.js and every pattern in
+intent_mentalhealth.json are compiled into one Aho-Corasick automaton, so an
+entry is scanned once however many phrases there are. The automaton runs over
+word tokens rather than characters: matches always fall on word boundaries
+("die" does not fire inside "diet") and there are ~5x fewer transitions.
+
+A phrase ending in "*" matches any word starting with its last word instead
+("hopeless*" fires on "hopelessness"); those are few and are matched with one
+regex. Crisis terms use this for stems, so the matcher flags at least what the
+substring check in routes/journal.js flags, apart from matches inside longer words.
+
+    python matcher.py build                       # -> matcher.pkl
+    python matcher.py scan journals.jsonl -o flagged.jsonl -j 4
+    python matcher.py serve --port 8766           # POST /classify {"text"} or {"texts"}
+"""
+import argparse
+import json
+import os
+import pickle
+import queue
+import re
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import ThreadingHTTPServer
+from multiprocessing import Pool
+
+from jsonstream import iter_records
+from util import JSONHandler, fold, words
+
+CRISIS = "crisis"
+# routes/journal.js keywords (keep in sync) with their stems; "*" marks a word prefix
+CRISIS_KEYWORDS = [
+    "suicid*",
+    "kill myself",
+    "killing myself",
+    "end my life",
+    "ending my life",
+    "end it all",
+    "die",
+    "dies",
+    "died",
+    "dying",
+    "hopeless*",
+    "worthless*",
+    "can’t go on",
+    "cant go on",
+    "tired of living",
+    "cut myself",
+    "cutting myself",
+    "hurt myself",
+    "hurting myself",
+    "no reason to live",
+    "goodbye forever",
+    "better off dead",
+]
+FORMAT_VERSION = 2
+MAX_TEXTS = 256
+
+
+class Matcher:
+    def __init__(self, phrases):
+        """phrases: iterable of (phrase, label)."""
+        self.patterns = []  # (label, token length, phrase)
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]  # pattern ids ending at each state
+        self.prefixes = []  # (label, token length, phrase) of "*" phrases
+        for phrase, label in phrases:
+            tokens = words(phrase)
+            if not tokens:
+                continue
+            if phrase.endswith("*"):
+                self.prefixes.append((label, len(tokens), phrase))
+                continue
+            state = 0
+            for tok in tokens:
+                nxt = self.goto[state].get(tok)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][tok] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                state = nxt
+            self.out[state].append(len(self.patterns))
+            self.patterns.append((label, len(tokens), phrase))
+        self._link_failures()
+        self._compile_prefixes()
+
+    def _compile_prefixes(self):
+        # one group per phrase, so match.lastgroup says which phrase fired
+        alts = [f"(?P<p{i}>" + r"[^a-z0-9']+".join(map(re.escape, words(phrase))) + ")"
+                for i, (_, _, phrase) in enumerate(self.prefixes)]
+        self.prefix_re = re.compile(r"(?<![a-z0-9'])(?:" + "|".join(alts) + ")") if alts else None
+
+    def _link_failures(self):
+        # BFS; `link` jumps straight to the nearest state down the failure chain that has output
+        self.link = [0] * len(self.goto)
+        todo = deque(self.goto[0].values())
+        while todo:
+            state = todo.popleft()
+            for tok, nxt in self.goto[state].items():
+                f = self.fail[state]
+                while f and tok not in self.goto[f]:
+                    f = self.fail[f]
+                f = self.goto[f].get(tok, 0)
+                self.fail[nxt] = f
+                self.link[nxt] = f if self.out[f] else self.link[f]
+                todo.append(nxt)
+
+    @classmethod
+    def from_intents(cls, path="intent_mentalhealth.json", crisis=CRISIS_KEYWORDS):
+        with open(path, "r", encoding="utf-8") as f:
+            intents = json.load(f).get("intents", [])
+        phrases = [(kw, CRISIS) for kw in crisis]
+        phrases += [(pattern, intent["tag"]) for intent in intents for pattern in intent.get("patterns", [])]
+        return cls(phrases)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            state = {"version": FORMAT_VERSION, "patterns": self.patterns, "goto": self.goto,
+                     "fail": self.fail, "out": self.out, "link": self.link, "prefixes": self.prefixes}
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        if state.get("version") != FORMAT_VERSION:
+            raise ValueError(f"{path}: matcher format {state.get('version')}, expected {FORMAT_VERSION}")
+        self = cls.__new__(cls)
+        for name in ("patterns", "goto", "fail", "out", "link", "prefixes"):
+            setattr(self, name, state[name])
+        self._compile_prefixes()
+        return self
+
+    def matches(self, text):
+        """Ids of every pattern occurrence in `text`."""
+        goto, fail, out, link = self.goto, self.fail, self.out, self.link
+        found = []
+        state = 0
+        for tok in words(text):
+            while state and tok not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(tok, 0)
+            s = state if out[state] else link[state]
+            while s:
+                found.extend(out[s])
+                s = link[s]
+        return found
+
+    def prefix_matches(self, text):
+        """(label, token length, phrase) of every "*" phrase occurrence in `text`."""
+        if self.prefix_re is None:
+            return []
+        return [self.prefixes[int(m.lastgroup[1:])] for m in self.prefix_re.finditer(fold(text))]
+
+    def classify(self, text):
+        crisis_terms, scores = set(), {}
+        hits = [self.patterns[pid] for pid in self.matches(text)] + self.prefix_matches(text)
+        for label, length, phrase in hits:
+            if label == CRISIS:
+                crisis_terms.add(phrase)
+            else:
+                scores[label] = scores.get(label, 0) + length
+        return {
+            "crisis": bool(crisis_terms),
+            "crisis_terms": sorted(crisis_terms),
+            "intent": max(scores, key=scores.get) if scores else None,
+            "intent_scores": scores,
+        }
+
+    def classify_many(self, texts):
+        return [self.classify(t) for t in texts]
+
+
+class MicroBatcher:
+    """Collects concurrent requests for up to `max_wait` seconds (or `max_batch`
+    items) and classifies them in one call on a single worker thread."""
+
+    def __init__(self, fn, max_batch=64, max_wait=0.002):
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = queue.Queue()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, text):
+        fut = Future()
+        self.queue.put((text, fut))
+        return fut
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            try:
+                results = self.fn([text for text, _ in batch])
+            except Exception as err:
+                for _, fut in batch:
+                    fut.set_exception(err)
+                continue
+            for (_, fut), result in zip(batch, results):
+                fut.set_result(result)
+
+
+def make_handler(batcher):
+    class Handler(JSONHandler):
+        def do_POST(self):
+            if self.path != "/classify":
+                return self._send(404, {"error": "not found"})
+            body = self._read_json()
+            if body is None:
+                return
+            if "texts" in body:
+                texts = body["texts"]
+                if not (isinstance(texts, list) and len(texts) <= MAX_TEXTS and all(isinstance(t, str) for t in texts)):
+                    return self._send(400, {"error": f"texts must be a list of at most {MAX_TEXTS} strings"})
+                futures = [batcher.submit(t) for t in texts]
+                return self._send(200, {"results": [fut.result() for fut in futures]})
+            if not isinstance(body.get("text"), str) or not body["text"]:
+                return self._send(400, {"error": "text must be a non-empty string"})
+            self._send(200, batcher.submit(body["text"]).result())
+
+    return Handler
+
+
+_worker = None
+
+
+def _init_worker(path):
+    global _worker
+    _worker = Matcher.load(path)
+
+
+def _classify_chunk(texts):
+    return _worker.classify_many(texts)
+
+
+def _chunks(records, field, size):
+    chunk = []
+    for rec in records:
+        chunk.append(rec.get(field) or "")
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def scan(path, matcher_path, out, field="content", jobs=1, chunk=512):
+    """Classify every record of a JSON/JSONL export; returns (records, crisis count)."""
+    chunks = _chunks(iter_records(path), field, chunk)
+    with open(out, "w", encoding="utf-8") as f:
+        if jobs <= 1:
+            _init_worker(matcher_path)
+            return _write_flags(map(_classify_chunk, chunks), f)
+        with Pool(jobs, initializer=_init_worker, initargs=(matcher_path,)) as pool:
+            return _write_flags(pool.imap(_classify_chunk, chunks), f)
+
+
+def _write_flags(results, f):
+    n = flagged = 0
+    for batch in results:
+        for result in batch:
+            f.write(json.dumps(dict(result, index=n), ensure_ascii=False) + "\n")
+            flagged += result["crisis"]
+            n += 1
+    return n, flagged
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = p.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build")
+    b.add_argument("intents", nargs="?", default="intent_mentalhealth.json")
+    b.add_argument("-o", "--out", default="matcher.pkl")
+    s = sub.add_parser("scan")
+    s.add_argument("export", help="JSON array or JSONL of journal entries")
+    s.add_argument("-m", "--matcher", default="matcher.pkl")
+    s.add_argument("-o", "--out", default="journal_flags.jsonl")
+    s.add_argument("--field", default="content")
+    s.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1)
+    v = sub.add_parser("serve")
+    v.add_argument("-m", "--matcher", default="matcher.pkl")
+    v.add_argument("--host", default="127.0.0.1")
+    v.add_argument("--port", type=int, default=8766)
+    v.add_argument("--max-batch", type=int, default=64)
+    v.add_argument("--max-wait-ms", type=float, default=2.0)
+    args = p.parse_args(argv)
+
+    if args.cmd == "build":
+        matcher = Matcher.from_intents(args.intents)
+        matcher.save(args.out)
+        print(f"Compiled {len(matcher.patterns)} patterns into {len(matcher.goto)} states ✅")
+    elif args.cmd == "scan":
+        start = time.perf_counter()
+        n, flagged = scan(args.export, args.matcher, args.out, field=args.field, jobs=args.jobs)
+        elapsed = time.perf_counter() - start
+        print(f"Scanned {n} entries in {elapsed:.2f}s ({n / elapsed if elapsed else 0:.0f}/s), "
+              f"{flagged} with crisis indicators -> {args.out}", file=sys.stderr)
+    else:
+        matcher = Matcher.load(args.matcher)
+        batcher = MicroBatcher(matcher.classify_many, args.max_batch, args.max_wait_ms / 1000)
+        server = ThreadingHTTPServer((args.host, args.port), make_handler(batcher))
+        print(f"🚨 Matcher serving {len(matcher.patterns)} patterns on http://{args.host}:{args.port}/classify")
+        server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import json
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+_clock = time.perf_counter
+
+
+class Stage:
+    def __init__(self, name):
+        self.name = name
+        self.seconds = 0.0
+        self.records_in = 0
+        self.records_out = 0
+        self.dropped = Counter()
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.inclusive = 0.0  # time including upstream generator stages
+
+    def to_dict(self):
+        return {"stage": self.name, "seconds": round(self.seconds, 6), "records_in": self.records_in,
+                "records_out": self.records_out, "dropped": dict(self.dropped),
+                "bytes_read": self.bytes_read, "bytes_written": self.bytes_written}
+
+    def merge(self, d):
+        self.seconds += d["seconds"]
+        self.records_in += d["records_in"]
+        self.records_out += d["records_out"]
+        self.dropped.update(d["dropped"])
+        self.bytes_read += d["bytes_read"]
+        self.bytes_written += d["bytes_written"]
+
+
+class Metrics:
+    """Per-stage wall time, record and byte counts for the corpus pipeline.
+
+    Generator stages are chained (merge -> dedup -> columnar -> write), so each
+    one is charged only for the time spent in it, not in the stages it pulls from.
+    Source stages (parse, normalize, shard_write) are summed over worker processes."""
+
+    def __init__(self):
+        self.stages = {}
+        self.extra = {}
+
+    def stage(self, name):
+        if name not in self.stages:
+            self.stages[name] = Stage(name)
+        return self.stages[name]
+
+    @contextmanager
+    def timed(self, name, upstream=None):
+        st = self.stage(name)
+        start = _clock()
+        try:
+            yield st
+        finally:
+            st.inclusive += _clock() - start
+            st.seconds = st.inclusive - (self.stages[upstream].inclusive if upstream else 0.0)
+
+    def track(self, name, recs, upstream=None):
+        """Wrap `recs`, charging the time spent producing records to `name`."""
+        st = self.stage(name)  # registered now, so stages list in pipeline order
+        up = self.stages[upstream] if upstream else None
+        return self._track(st, iter(recs), up)
+
+    @staticmethod
+    def _track(st, it, up):
+        while True:
+            start = _clock()
+            try:
+                rec = next(it)
+            except StopIteration:
+                st.inclusive += _clock() - start
+                break
+            st.inclusive += _clock() - start
+            st.records_out += 1
+            yield rec
+        st.records_in = up.records_out if up else st.records_out
+        st.seconds = st.inclusive - (up.inclusive if up else 0.0)
+
+    def merge(self, stages, counts_only=False):
+        """Add stage dicts from workers; with `counts_only` (stages of a cached build)
+        only records and drops carry over, as no time or I/O was spent on them now."""
+        for d in stages:
+            self.stage(d["stage"]).merge(dict(d, seconds=0.0, bytes_read=0, bytes_written=0) if counts_only else d)
+
+    def to_dict(self):
+        return {"stages": [st.to_dict() for st in self.stages.values()], **self.extra}
+
+    def write_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def table(self):
+        rows = [("stage", "seconds", "in", "out", "read", "written", "dropped")]
+        for st in self.stages.values():
+            dropped = " ".join(f"{reason}={n}" for reason, n in sorted(st.dropped.items()))
+            rows.append((st.name, f"{st.seconds:.3f}", str(st.records_in), str(st.records_out),
+                         _size(st.bytes_read), _size(st.bytes_written), dropped))
+        widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+        return "\n".join("  ".join(cell.ljust(w) if i in (0, 6) else cell.rjust(w)
+                                   for i, (cell, w) in enumerate(zip(row, widths))).rstrip()
+                         for row in rows)
+
+
+def _size(n):
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB":
+            return f"{n:.0f}{unit}" if unit == "B" else f"{n:.1f}{unit}"
+        n /= 1024
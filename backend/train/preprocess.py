@@ -1,25 +1,272 @@
+import argparse
+import cProfile
 import json
+import os
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
 
-with open("mentalchat16k.json", "r", encoding="utf-8") as f1:
-    d1 = json.load(f1)
-with open("intent_mentalhealth.json", "r", encoding="utf-8") as f2:
-    d2 = json.load(f2)
+from columnar import ColumnarWriter
+from dedup import Deduper
+from manifest import BuildCache
+from metrics import Metrics
+from sources import ADAPTERS, parse_spec
+from tokens import example_tokens
 
-merged = []
-def normalize(entry):
-    user = entry.get("input") or entry.get("user") or entry.get("text") or ""
-    assistant = entry.get("output") or entry.get("response") or entry.get("reply") or ""
-    return {"question": user.strip(), "answer": assistant.strip()} if user and assistant else None
+SOURCES = ["mentalchat16k.json", "intent_mentalhealth.json"]
+PIPELINE_VERSION = 3  # bump when normalize() output changes so cached shards are rebuilt
+USER_KEYS = ("input", "user", "text")
+ASSISTANT_KEYS = ("output", "response", "reply")
+_END = object()
 
-for data in (d1 if isinstance(d1, list) else d1.get("data", [])):
-    norm = normalize(data)
-    if norm: merged.append(norm)
 
-for data in (d2 if isinstance(d2, list) else d2.get("data", [])):
-    norm = normalize(data)
-    if norm: merged.append(norm)
+def _known_schema(entry):
+    keys = USER_KEYS + ASSISTANT_KEYS
+    return (isinstance(entry, dict) and any(k in entry for k in keys)
+            and all(isinstance(entry.get(k), (str, type(None))) for k in keys))
 
-with open("merged_mira.json", "w", encoding="utf-8") as f:
-    json.dump(merged, f, indent=2, ensure_ascii=False)
 
-print(f"Merged {len(merged)} records ✅")
+def _first_text(entry, keys):
+    # first value that is not blank, stripped
+    for k in keys:
+        text = (entry.get(k) or "").strip()
+        if text:
+            return text
+    return ""
+
+
+def normalize(entry, source=None):
+    if not _known_schema(entry):
+        return None
+    question, answer = _first_text(entry, USER_KEYS), _first_text(entry, ASSISTANT_KEYS)
+    if not (question and answer):
+        return None
+    rec = {"question": question, "answer": answer, "source": source}
+    if isinstance(entry.get("tag"), str) and entry["tag"]:
+        rec["tag"] = entry["tag"]
+    rec["tokens"] = example_tokens(question, answer)
+    return rec
+
+
+def drop_reason(entry):
+    """Why normalize() rejected `entry`."""
+    if not _known_schema(entry):
+        return "unknown_schema"
+    if not _first_text(entry, USER_KEYS):
+        return "empty_user"
+    return "empty_assistant"
+
+
+def build_shard(path, kind, shard, stream=False):
+    """Normalize one source into a JSONL shard; runs in a worker process.
+    Returns (record count, stage metrics)."""
+    source = os.path.basename(path)
+    metrics = Metrics()
+    parse, norm_stage, write = metrics.stage("parse"), metrics.stage("normalize"), metrics.stage("shard_write")
+    parse.bytes_read = os.path.getsize(path)
+    clock = time.perf_counter
+    tmp = shard + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        entries = iter(ADAPTERS[kind](path, stream))
+        while True:
+            t0 = clock()
+            entry = next(entries, _END)
+            t1 = clock()
+            parse.seconds += t1 - t0
+            if entry is _END:
+                break
+            parse.records_out += 1
+            norm = normalize(entry, source)
+            t2 = clock()
+            norm_stage.seconds += t2 - t1
+            if not norm:
+                norm_stage.dropped[drop_reason(entry)] += 1
+                continue
+            norm_stage.records_out += 1
+            f.write(json.dumps(norm, ensure_ascii=False) + "\n")
+            write.seconds += clock() - t2
+        write.bytes_written = f.tell()
+    os.replace(tmp, shard)
+    parse.records_in = norm_stage.records_in = parse.records_out
+    write.records_in = write.records_out = norm_stage.records_out
+    return norm_stage.records_out, metrics.to_dict()["stages"]
+
+
+def build_shards(specs, cache, metrics, stream=False, jobs=None, force=False):
+    """Reuse cached shards for unchanged sources and rebuild the rest in parallel.
+    Source stage metrics of cached shards come from the manifest, so record and
+    drop counts cover every source either way.
+    Returns [(path, adapter, shard, count, cached)] in input order."""
+    plan, todo = [], []
+    with metrics.timed("cache") as st:
+        for spec in specs:
+            path, kind = parse_spec(spec)
+            shard, entry, hit = cache.lookup(path, kind, force=force)
+            plan.append([path, kind, shard, entry["records"], hit, entry])
+            if hit:
+                st.records_out += entry["records"]
+                metrics.merge(entry["stages"], counts_only=True)
+            else:
+                todo.append(plan[-1])
+    jobs = min(jobs or os.cpu_count() or 1, len(todo))
+    if jobs <= 1:
+        results = [build_shard(path, kind, shard, stream) for path, kind, shard, *_ in todo]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(build_shard, path, kind, shard, stream) for path, kind, shard, *_ in todo]
+            results = [fut.result() for fut in futures]
+    for item, (count, stages) in zip(todo, results):
+        item[3] = count
+        item[5].update(records=count, stages=stages)
+        metrics.merge(stages)
+    for path, *_, entry in plan:
+        cache.record(path, entry)
+    cache.save()
+    return [tuple(item[:5]) for item in plan]
+
+
+def read_shards(shards):
+    for shard in shards:
+        with open(shard, "r", encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+
+
+def write_json(recs, path):
+    merged = list(recs)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(merged, f, indent=2, ensure_ascii=False)
+    return len(merged)
+
+
+def write_json_stream(recs, path):
+    # byte-identical to write_json, one record at a time
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for rec in recs:
+            f.write(",\n  " if count else "[\n  ")
+            f.write(json.dumps(rec, indent=2, ensure_ascii=False).replace("\n", "\n  "))
+            count += 1
+        f.write("\n]" if count else "[]")
+    return count
+
+
+def write_jsonl(recs, path):
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for rec in recs:
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+
+def report_sources(built):
+    for path, kind, _, count, cached in built:
+        mark = "⚠️ " if count == 0 else "  "
+        print(f"{mark}{path} [{kind}]: {count} records ({'cached' if cached else 'rebuilt'})")
+    hits = sum(1 for *_, cached in built if cached)
+    print(f"Cache: {hits} hit, {len(built) - hits} miss")
+
+
+def run(args, metrics):
+    output = args.output or f"merged_mira.{args.format}"
+    cache = BuildCache(args.cache_dir, PIPELINE_VERSION)
+    built = build_shards(args.sources, cache, metrics, stream=args.stream, jobs=args.jobs, force=args.force)
+    report_sources(built)
+
+    shards = [shard for _, _, shard, *_ in built]
+    metrics.stage("merge").bytes_read = sum(os.path.getsize(shard) for shard in shards)
+    recs, last = metrics.track("merge", read_shards(shards)), "merge"
+    deduper = Deduper(threshold=args.dedup_threshold) if args.dedup else None
+    if deduper:
+        recs, last = metrics.track("dedup", deduper.filter(recs), upstream=last), "dedup"
+    columnar = None
+    if args.columnar:
+        columnar = ColumnarWriter(args.columnar, compression="zstd" if args.zstd else None)
+        columnar_upstream = last
+        recs, last = metrics.track("columnar", columnar.tee(recs), upstream=last), "columnar"
+
+    with metrics.timed("write", upstream=last) as st:
+        if args.format == "jsonl":
+            count = write_jsonl(recs, output)
+        elif args.stream:
+            count = write_json_stream(recs, output)
+        else:
+            count = write_json(recs, output)
+    st.records_in = st.records_out = count
+    st.bytes_written = os.path.getsize(output)
+    if columnar:
+        with metrics.timed("columnar", upstream=columnar_upstream) as st:
+            columnar.close()
+        st.bytes_written = os.path.getsize(args.columnar)
+
+    if deduper:
+        st = metrics.stage("dedup")
+        st.dropped["near_duplicate"] = st.records_in - st.records_out
+        deduper.write_report(args.dedup_report)
+        print(f"Dedup: removed {deduper.seen - count} near-duplicates, "
+              f"{count} clusters (report: {args.dedup_report})")
+    print(f"Merged {count} records ✅")
+    return count
+
+
+def tracemalloc_summary(top=10):
+    current, peak = tracemalloc.get_traced_memory()
+    stats = tracemalloc.take_snapshot().statistics("lineno")[:top]
+    return {"current_mb": round(current / (1 << 20), 2), "peak_mb": round(peak / (1 << 20), 2),
+            "top": [{"where": str(s.traceback), "size_kb": round(s.size / 1024, 1), "count": s.count}
+                    for s in stats]}
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Merge the MIRA training sources into one corpus.")
+    p.add_argument("sources", nargs="*", default=SOURCES,
+                   help=f"path or path:adapter ({', '.join(ADAPTERS)}); adapter is detected when omitted")
+    p.add_argument("-o", "--output", help="default: merged_mira.json / merged_mira.jsonl")
+    p.add_argument("--format", choices=("json", "jsonl"), default="json")
+    p.add_argument("--stream", action="store_true",
+                   help="parse and write incrementally; memory stays flat regardless of input size")
+    p.add_argument("-j", "--jobs", type=int,
+                   help="worker processes for loading sources (default: one per source, up to the CPU count)")
+    p.add_argument("--dedup", action="store_true", help="drop near-duplicate questions (MinHash LSH)")
+    p.add_argument("--dedup-threshold", type=float, default=0.7, help="Jaccard similarity on question shingles")
+    p.add_argument("--dedup-report", default="dedup_report.json")
+    p.add_argument("--columnar", metavar="PATH",
+                   help="also write a compact columnar artifact (e.g. merged_mira.col)")
+    p.add_argument("--zstd", action="store_true", help="zstd-compress the columnar artifact in blocks")
+    p.add_argument("--cache-dir", default=".mira_cache", help="normalized shards and the build manifest")
+    p.add_argument("--force", action="store_true", help="ignore the cache and rebuild every source")
+    p.add_argument("--metrics", action="store_true", help="print per-stage metrics as a table")
+    p.add_argument("--metrics-json", metavar="PATH", help="write per-stage metrics as JSON")
+    p.add_argument("--profile", metavar="PATH",
+                   help="cProfile the main process into PATH (with -j 1 this includes source parsing)")
+    p.add_argument("--tracemalloc", action="store_true", help="record peak traced memory and top allocation sites")
+    args = p.parse_args(argv)
+
+    metrics = Metrics()
+    if args.tracemalloc:
+        tracemalloc.start()
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler:
+        profiler.enable()
+    try:
+        count = run(args, metrics)
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+    if args.tracemalloc:
+        metrics.extra["tracemalloc"] = tracemalloc_summary()
+        tracemalloc.stop()
+
+    if args.metrics:
+        print(metrics.table())
+        if args.tracemalloc:
+            print(f"tracemalloc peak: {metrics.extra['tracemalloc']['peak_mb']} MB")
+    if args.metrics_json:
+        metrics.write_json(args.metrics_json)
+    return count
+
+
+if __name__ == "__main__":
+    main()
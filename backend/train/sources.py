@@ -0,0 +1,65 @@
+import itertools
+import json
+import re
+
+from jsonstream import iter_array
+
+# name -> fn(path, stream) yielding raw entries for normalize()
+ADAPTERS = {}
+
+
+def adapter(name):
+    def register(fn):
+        ADAPTERS[name] = fn
+        return fn
+    return register
+
+
+@adapter("qa")
+def qa_entries(path, stream=False):
+    """Flat list of Q/A dicts, or an object holding that list under "data"."""
+    if stream:
+        yield from iter_array(path, key="data")
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        d = json.load(f)
+    yield from (d if isinstance(d, list) else d.get("data", []))
+
+
+@adapter("intents")
+def intent_entries(path, stream=False):
+    """{"intents": [{tag, patterns, responses}]}; every pattern is paired with every
+    response of its intent, lazily."""
+    if stream:
+        intents = iter_array(path, key="intents")
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            intents = json.load(f).get("intents", [])
+    for intent in intents:
+        tag = intent.get("tag")
+        for pattern, response in itertools.product(intent.get("patterns", []), intent.get("responses", [])):
+            yield {"input": pattern, "output": response, "tag": tag}
+
+
+@adapter("jsonl")
+def jsonl_entries(path, stream=False):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def detect(path):
+    if path.endswith(".jsonl"):
+        return "jsonl"
+    with open(path, "r", encoding="utf-8") as f:
+        head = f.read(4096)
+    return "intents" if re.match(r'\s*\{\s*"intents"\s*:', head) else "qa"
+
+
+def parse_spec(spec):
+    """"path" or "path:adapter" -> (path, adapter)."""
+    path, sep, kind = spec.rpartition(":")
+    if sep and kind in ADAPTERS:
+        return path, kind
+    return spec, detect(spec)
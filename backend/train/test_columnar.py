@@ -0,0 +1,62 @@
+import pytest
+
+import columnar
+from columnar import ColumnarReader, ColumnarWriter
+
+COMPRESSION = [None, pytest.param("zstd", marks=pytest.mark.skipif(
+    columnar.zstandard is None, reason="zstandard is not installed"))]
+
+
+def _rows(n):
+    # varied lengths, empty cells and non-ASCII text, so offsets and block bases are exercised
+    return [{"question": f"question {i} " + "é" * (i % 7), "answer": "a" * (i % 13) + "’ok",
+             "source": "intents.json" if i % 2 else "mentalchat.json", "tag": "" if i % 3 else f"tag{i % 5}",
+             "tokens": i * 3} for i in range(n)]
+
+
+def _expected(rec):
+    return {"question": rec["question"], "answer": rec["answer"], "source": rec["source"],
+            "tag": rec["tag"], "tokens": rec["tokens"]}
+
+
+@pytest.mark.parametrize("compression", COMPRESSION)
+@pytest.mark.parametrize("rows", [0, 1, 4095, 4096, 4097, 10000])
+def test_round_trip(tmp_path, rows, compression):
+    path = str(tmp_path / "corpus.col")
+    recs = _rows(rows)
+    with ColumnarWriter(path, compression=compression) as writer:
+        assert list(writer.tee(recs)) == recs
+    with ColumnarReader(path) as reader:
+        assert len(reader) == rows
+        assert reader.compression == compression
+        assert list(reader) == [_expected(r) for r in recs]
+        for i in (0, 1, 4095, 4096, 4097, rows - 1):
+            if 0 <= i < rows:
+                assert reader[i] == _expected(recs[i])
+                assert bytes(reader.raw("question", i)) == recs[i]["question"].encode("utf-8")
+        assert reader[-1:] == [_expected(r) for r in recs[-1:]]
+        assert list(reader.numbers("tokens")) == [r["tokens"] for r in recs]
+        with pytest.raises(IndexError):
+            reader.raw("answer", rows)
+
+
+def test_blob(tmp_path):
+    path = str(tmp_path / "corpus.col")
+    recs = _rows(100)
+    with ColumnarWriter(path) as writer:
+        for rec in recs:
+            writer.add(rec)
+    reader = ColumnarReader(path)
+    data, offsets = reader.blob("answer", 10, 20)
+    cells = [bytes(data[offsets[i] - offsets[0]:offsets[i + 1] - offsets[0]]).decode("utf-8")
+             for i in range(10)]
+    assert cells == [r["answer"] for r in recs[10:20]]
+    del data, offsets
+    reader.close()
+
+
+def test_not_columnar(tmp_path):
+    path = tmp_path / "corpus.col"
+    path.write_bytes(b"not a columnar file at all")
+    with pytest.raises(ValueError):
+        ColumnarReader(str(path))
@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+import index
+from index import Index, build_index
+
+# one question paired with many answers, as the intents adapter produces
+ROWS = ([{"question": "Hello", "answer": f"Hi there, answer {i}", "tag": "greeting"} for i in range(12)]
+        + [{"question": "hello!", "answer": "Same question, other punctuation"},
+           {"question": "Hello, my friend", "answer": "Hey friend"},
+           {"question": "Hello there", "answer": "Hello to you"},
+           {"question": "Hello, how are you?", "answer": "Doing well"},
+           {"question": "I'm stressed about exams", "answer": "Exams are a lot"},
+           {"question": "I can't sleep", "answer": "Sleep is hard"}])
+
+
+@pytest.fixture(params=["numpy", "python"])
+def idx(request, tmp_path, monkeypatch):
+    if request.param == "python":
+        monkeypatch.setattr(index, "np", None)
+    elif index.np is None:
+        pytest.skip("numpy is not installed")
+    corpus = tmp_path / "corpus.jsonl"
+    corpus.write_text("".join(json.dumps(r) + "\n" for r in ROWS), encoding="utf-8")
+    build_index(str(corpus), str(tmp_path / "idx"))
+    return Index(str(tmp_path / "idx"))
+
+
+def _questions(results):
+    return [r["question"] for r in results]
+
+
+def test_search_collapses_repeated_questions(idx):
+    questions = _questions(idx.search("hello", 4))
+    assert len(questions) == 4
+    assert len({q.lower().strip("!") for q in questions}) == 4
+    assert questions[0] in ("Hello", "hello!")
+
+
+def test_search_budget_collapses_repeated_questions(idx):
+    results = idx.search("hello", 3, budget=600)
+    assert len(results) == 3
+    assert len(set(_questions(results))) == 3
+    assert sum(r["tokens"] for r in results) <= 600
+
+
+def test_search_returns_fewer_when_questions_run_out(idx):
+    assert _questions(idx.search("exams", 5)) == ["I'm stressed about exams"]
+    assert idx.search("exams", 0) == []
+    assert idx.search("nothing matches this", 5) == []
@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+from jsonstream import iter_array, iter_records
+
+DOCS = [
+    [],
+    [0.1],
+    [12.5, -3, 1e-7, 6.02E23, 0, -0.0, 123456789012345678901234567890],
+    [True, False, None, "", "a\\\"b", "é’ 😀"],
+    [{"input": "I feel anxious", "output": "That sounds hard.", "n": 3.25}, {"nested": [1, [2.5, {}]]}],
+    [[], {}, [[]], {"a": {"b": {"c": 10}}}],
+]
+CHUNK_SIZES = [1, 2, 3, 5, 7, 64, 1 << 16]
+
+
+def _write(tmp_path, text, name="doc.json"):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+@pytest.mark.parametrize("indent", [None, 2])
+@pytest.mark.parametrize("doc", DOCS)
+def test_array_round_trip(tmp_path, doc, indent, chunk_size):
+    path = _write(tmp_path, json.dumps(doc, indent=indent, ensure_ascii=False))
+    with open(path, "r", encoding="utf-8") as f:
+        expected = json.load(f)
+    assert list(iter_array(path, chunk_size=chunk_size)) == expected
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+@pytest.mark.parametrize("doc", DOCS)
+def test_keyed_array_round_trip(tmp_path, doc, chunk_size):
+    # scalars and containers before the key are skipped across buffer edges too
+    wrapper = {"version": 10.25, "flag": True, "meta": {"n": [1.5, 2]}, "data": doc, "after": 7}
+    path = _write(tmp_path, json.dumps(wrapper, indent=2))
+    assert list(iter_array(path, key="data", chunk_size=chunk_size)) == doc
+    assert list(iter_array(path, key="missing", chunk_size=chunk_size)) == []
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3])
+def test_split_number(tmp_path, chunk_size):
+    path = _write(tmp_path, "[0.1, 12.75,1e10 ,-2]")
+    assert list(iter_array(path, chunk_size=chunk_size)) == [0.1, 12.75, 1e10, -2]
+
+
+def test_malformed(tmp_path):
+    with pytest.raises(ValueError):
+        list(iter_array(_write(tmp_path, "[1 2]"), chunk_size=1))
+    with pytest.raises(ValueError):
+        list(iter_array(_write(tmp_path, '"text"')))
+
+
+def test_iter_records_jsonl(tmp_path):
+    rows = [{"question": "q", "answer": "a", "tokens": 4}, {"question": "r", "answer": "b", "tokens": 5}]
+    path = _write(tmp_path, "\n".join(json.dumps(r) for r in rows) + "\n\n", name="doc.jsonl")
+    assert list(iter_records(path)) == rows
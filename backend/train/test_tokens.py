@@ -0,0 +1,76 @@
+import itertools
+import random
+
+import pytest
+
+from tokens import approx_tokens, example_tokens, pack
+
+
+def _cands(pairs):
+    return [{"score": score, "tokens": tokens, "id": i} for i, (score, tokens) in enumerate(pairs)]
+
+
+def _ids(chosen):
+    return [c["id"] for c in chosen]
+
+
+def _best_score(candidates, budget, max_items):
+    best = 0.0
+    for n in range(min(len(candidates), max_items) + 1):
+        for subset in itertools.combinations(candidates, n):
+            if sum(c["tokens"] for c in subset) <= budget:
+                best = max(best, sum(c["score"] for c in subset))
+    return best
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_knapsack_is_optimal(seed):
+    rng = random.Random(seed)
+    candidates = _cands((round(rng.uniform(0.1, 10), 3), rng.randint(0, 60)) for _ in range(rng.randint(0, 9)))
+    budget, max_items = rng.randint(0, 150), rng.randint(0, 6)
+    chosen = pack(candidates, budget, max_items=max_items, method="knapsack")
+    assert len(chosen) <= max_items
+    assert sum(c["tokens"] for c in chosen) <= budget
+    assert _ids(chosen) == sorted(_ids(chosen))  # relevance order preserved
+    assert sum(c["score"] for c in chosen) == pytest.approx(_best_score(candidates, budget, max_items))
+    greedy = pack(candidates, budget, max_items=max_items)
+    assert sum(c["score"] for c in greedy) <= sum(c["score"] for c in chosen) + 1e-9
+
+
+def test_greedy_takes_candidates_in_order_while_they_fit():
+    candidates = _cands([(9, 50), (8, 60), (7, 30), (6, 20)])
+    assert _ids(pack(candidates, 100)) == [0, 2, 3]
+    assert _ids(pack(candidates, 100, method="knapsack")) == [0, 2, 3]
+    # greedy keeps the best candidate even when two smaller ones score more together
+    candidates = _cands([(10, 100), (6, 50), (6, 50)])
+    assert _ids(pack(candidates, 100)) == [0]
+    assert _ids(pack(candidates, 100, method="knapsack")) == [1, 2]
+
+
+@pytest.mark.parametrize("method", ["greedy", "knapsack"])
+def test_max_items(method):
+    candidates = _cands([(5, 10), (4, 10), (3, 10), (2, 10)])
+    assert _ids(pack(candidates, 1000, max_items=2, method=method)) == [0, 1]
+    assert pack(candidates, 1000, max_items=0, method=method) == []
+
+
+@pytest.mark.parametrize("method", ["greedy", "knapsack"])
+def test_budget_zero_and_oversized_items(method):
+    candidates = _cands([(5, 1), (4, 0), (3, 500)])
+    assert _ids(pack(candidates, 0, method=method)) == [1]
+    assert _ids(pack(candidates, 100, method=method)) == [0, 1]
+    assert pack(_cands([(9, 101)]), 100, method=method) == []
+    assert pack([], 100, method=method) == []
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        pack(_cands([(1, 1)]), -1)
+    with pytest.raises(ValueError):
+        pack(_cands([(1, 1)]), 10, method="best")
+
+
+def test_token_estimates():
+    assert approx_tokens("") == 0
+    assert approx_tokens("I feel anxious.") == 1 + 1 + 2 + 1
+    assert example_tokens("hi", "hello") == 1 + 2 + 6
@@ -0,0 +1,137 @@
+"""Approximate token counts, token-budgeted few-shot packing and prompt-size stats.
+
+Counts follow the usual BPE rule of thumb (a word is about one token per four
+characters, punctuation is one token each); they are meant for budgeting, not
+billing, and need no tokenizer dependency.
+
+    python tokens.py stats merged_mira.json --budget 600
+"""
+import argparse
+import json
+import math
+import random
+import re
+
+from jsonstream import iter_records
+
+_piece = re.compile(r"\w+|[^\w\s]")
+# routes/chat.js: SYSTEM_PROMPT plus the example/continuation scaffolding
+SYSTEM_TOKENS = 165
+
+
+def approx_tokens(text):
+    return sum(math.ceil(len(p) / 4) for p in _piece.findall(text))
+
+
+def example_tokens(question, answer):
+    """Tokens of one few-shot example as chat.js renders it: "User: q\\nMira: a"."""
+    return approx_tokens(question) + approx_tokens(answer) + 6
+
+
+def pack(candidates, budget, max_items=None, method="greedy"):
+    """Most relevant subset of `candidates` (dicts with "score" and "tokens",
+    best first) whose tokens fit in `budget`, returned in relevance order.
+
+    greedy takes candidates in relevance order while they fit; knapsack
+    maximizes the total score exactly (0/1 knapsack over tokens and item count)."""
+    if budget < 0:
+        raise ValueError(f"budget must not be negative: {budget}")
+    if method == "greedy":
+        chosen, used = [], 0
+        for c in candidates:
+            if max_items is not None and len(chosen) == max_items:
+                break
+            if used + c["tokens"] <= budget:
+                chosen.append(c)
+                used += c["tokens"]
+        return chosen
+    if method != "knapsack":
+        raise ValueError(f"unknown packing method: {method}")
+    # best[j][t]: best score with at most j examples and at most t tokens; take[i] marks the
+    # (j, t) cells whose best used candidate i, so the choice is walked back at the end
+    k = min(len(candidates), len(candidates) if max_items is None else max_items)
+    width = budget + 1
+    best = [[0.0] * width for _ in range(k + 1)]
+    take = [bytearray((k + 1) * width) for _ in candidates]
+    for i, c in enumerate(candidates):
+        w, gain, marks = c["tokens"], c["score"], take[i]
+        if w > budget:
+            continue
+        for j in range(k, 0, -1):
+            prev, row, base = best[j - 1], best[j], j * width
+            for t in range(budget, w - 1, -1):
+                score = prev[t - w] + gain
+                if score > row[t]:
+                    row[t] = score
+                    marks[base + t] = 1
+    chosen, j, t = [], k, budget
+    for i in range(len(candidates) - 1, -1, -1):
+        if j and take[i][j * width + t]:
+            chosen.append(i)
+            j, t = j - 1, t - candidates[i]["tokens"]
+    return [candidates[i] for i in reversed(chosen)]
+
+
+def percentiles(values, ps=(50, 90, 95, 99)):
+    values = sorted(values)
+    if not values:
+        return {f"p{p}": 0 for p in ps}
+    return {f"p{p}": values[min(len(values) - 1, math.ceil(p / 100 * len(values)) - 1)] for p in ps}
+
+
+def summarize(values):
+    return {"count": len(values), "mean": round(sum(values) / len(values), 1) if values else 0,
+            **percentiles(values), "max": max(values, default=0)}
+
+
+def histogram(values, edges=(64, 128, 256, 512, 1024, 2048)):
+    counts = {}
+    for v in values:
+        label = next((f"<={e}" for e in edges if v <= e), f">{edges[-1]}")
+        counts[label] = counts.get(label, 0) + 1
+    return {label: counts.get(label, 0) for label in [f"<={e}" for e in edges] + [f">{edges[-1]}"]}
+
+
+def prompt_stats(corpus, k=5, budget=None, system_tokens=SYSTEM_TOKENS, samples=1000, seed=0):
+    """Per-record token distribution, and the size of prompts built from k examples
+    drawn at random: unbounded (today's chat.js) and, with `budget`, packed."""
+    tokens = [rec.get("tokens") or example_tokens(rec["question"], rec["answer"])
+              for rec in iter_records(corpus)]
+    rng = random.Random(seed)
+    unbounded, packed = [], []
+    for _ in range(samples if tokens else 0):
+        picks = [{"score": 1.0, "tokens": t} for t in rng.sample(tokens, min(k, len(tokens)))]
+        message = rng.choice(tokens)  # stand-in for the user's message
+        unbounded.append(system_tokens + message + sum(c["tokens"] for c in picks))
+        if budget is not None:
+            packed.append(system_tokens + message + sum(c["tokens"] for c in pack(picks, budget)))
+    stats = {"records": summarize(tokens), "record_histogram": histogram(tokens),
+             "prompt_unbounded": summarize(unbounded)}
+    if budget is not None:
+        stats["prompt_packed"] = dict(summarize(packed), budget=budget)
+    return stats
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = p.add_subparsers(dest="cmd", required=True)
+    s = sub.add_parser("stats")
+    s.add_argument("corpus", nargs="?", default="merged_mira.json")
+    s.add_argument("-k", type=int, default=5, help="few-shot examples per prompt")
+    s.add_argument("--budget", type=int, help="example token budget to compare against")
+    s.add_argument("--system-tokens", type=int, default=SYSTEM_TOKENS)
+    s.add_argument("--json", metavar="PATH", help="also write the stats as JSON")
+    args = p.parse_args(argv)
+
+    stats = prompt_stats(args.corpus, k=args.k, budget=args.budget, system_tokens=args.system_tokens)
+    for name in ("records", "prompt_unbounded", "prompt_packed"):
+        if name in stats:
+            print(f"{name:<18}" + "  ".join(f"{key}={val}" for key, val in stats[name].items()))
+    print("record tokens     " + "  ".join(f"{key}: {val}" for key, val in stats["record_histogram"].items()))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(stats, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Helpers shared by the corpus tools: little-endian array I/O, word tokens,
+JSON HTTP handlers and peak RSS."""
+import json
+import re
+import sys
+from array import array
+from http.server import BaseHTTPRequestHandler
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_word = re.compile(r"[a-z0-9']+")
+MAX_BODY = 1 << 20
+
+
+def write_le(f, arr):
+    """Write an array.array to `f` little-endian, whatever the host byte order."""
+    if sys.byteorder != "little":
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    arr.tofile(f)
+
+
+def fold(text):
+    """Lowercase, with curly apostrophes folded to straight ones."""
+    return text.lower().replace("’", "'")
+
+
+def words(text):
+    """Word tokens of fold(text)."""
+    return _word.findall(fold(text))
+
+
+class JSONHandler(BaseHTTPRequestHandler):
+    def _send(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self):
+        """The request body as a JSON object, or None after replying with an error."""
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            self._send(400, {"error": "invalid Content-Length"})
+            return None
+        if not 0 <= length <= MAX_BODY:
+            self._send(413 if length > 0 else 400, {"error": f"body must be 0 to {MAX_BODY} bytes"})
+            return None
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send(400, {"error": "invalid JSON"})
+            return None
+        if not isinstance(body, dict):
+            self._send(400, {"error": "body must be a JSON object"})
+            return None
+        return body
+
+    def log_message(self, *args):
+        pass
+
+
+def peak_rss_mb(children=False):
+    """Peak RSS of this process, or with `children` of it and its largest reaped child."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if children:
+        rss = max(rss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return rss / (1 << 20) if sys.platform == "darwin" else rss / 1024